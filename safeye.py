@@ -1,15 +1,31 @@
 import os
 import csv
+import re
+import functools
 import json
 import requests
 import smtplib
 import threading
+import time
 import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from email.message import EmailMessage
-from datetime import datetime, timedelta
-from logging.handlers import TimedRotatingFileHandler
+from email.policy import default as email_policy
+from datetime import datetime
+from typing import NamedTuple
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from http.cookiejar import DefaultCookiePolicy
+from requests.adapters import HTTPAdapter
+from requests.cookies import RequestsCookieJar
 from dotenv import load_dotenv  # Import load_dotenv function
 
+try:
+    # Faster JSON decoding when orjson is installed
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -25,11 +41,267 @@ RESUME_LOG_FILE = "resume.log"
 REQUESTS_CSV = "requests.csv"
 
 CHECK_INTERVAL = 30 * 60  # 30 minutes
+LOG_RETENTION_DAYS = 30  # Days of project logs to keep
+LOG_SWEEP_INTERVAL = 24 * 60 * 60  # Sweep the logs directory once a day
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", 16))  # Concurrent HTTP checks per cycle
+REQUEST_TIMEOUT = (3.05, 7)  # Connect and read timeouts in seconds
+MAX_BACKOFF_CYCLES = (
+    24 * 60 * 60 // CHECK_INTERVAL
+)  # Skip unreachable endpoints up to a day
 
 
-def send_email(to_emails, subject, body):
+class RequestConfig(NamedTuple):
     """
-    Sends an email to the specified recipients with the given subject and body.
+    A request configuration read from the CSV file, with its values already converted.
+    """
+
+    client: str
+    project_name: str
+    endpoint: str
+    expected_http_status: int
+    notify_emails: tuple
+    body: object
+    headers: dict
+    http_method: str
+    probe_method: str
+    prepared_request: object = None
+    prepared_probe: object = None
+
+
+# Columns read from requests.csv, all optional except REQUIRED_CSV_COLUMNS
+CSV_COLUMNS = (
+    "client",
+    "project_name",
+    "endpoint",
+    "expected_http_status",
+    "notify_emails",
+    "headers_json",
+    "body_json",
+    "http_method",
+    "probe_method",
+)
+REQUIRED_CSV_COLUMNS = ("endpoint",)
+
+
+class InvalidCsvHeaderError(ValueError):
+    """
+    Raised when the header of requests.csv lacks a column of REQUIRED_CSV_COLUMNS.
+    """
+
+
+# Commas between the addresses of notify_emails, with the whitespace around them. Addresses may
+# contain spaces (e.g. "John Doe <john@example.com>"), so whitespace alone doesn't separate them.
+EMAIL_SEPARATORS = re.compile(r"\s*,\s*")
+
+# Maps every non-alphanumeric ASCII character to an underscore
+FILENAME_TRANSLATION = {i: "_" for i in range(128) if not chr(i).isalnum()}
+
+# Shared HTTP session so keep-alive connections are reused across checks. Each host pool holds
+# up to MAX_WORKERS connections, so concurrent checks never wait on each other for a socket.
+# Its cookie jar accepts no cookies, so a check never depends on cookies set by an earlier one.
+http_session = requests.Session()
+http_session.cookies = RequestsCookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+http_session.mount(
+    "http://", HTTPAdapter(pool_connections=32, pool_maxsize=MAX_WORKERS)
+)
+http_session.mount(
+    "https://", HTTPAdapter(pool_connections=32, pool_maxsize=MAX_WORKERS)
+)
+
+
+class SmtpSession:
+    """
+    A reusable SMTP connection used to send several emails over a single login.
+
+    The connection is opened lazily on the first message and checked with NOOP before each
+    subsequent one, reconnecting if the server has dropped it. It can be used as a context
+    manager so the connection is closed once a batch of emails has been sent.
+    """
+
+    def __init__(self):
+        self.server = None
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def connect(self):
+        """
+        Opens a new SMTP connection, upgrades it with STARTTLS and logs in.
+
+        Returns:
+            None
+        """
+        self.close()
+        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
+        try:
+            server.starttls()
+            server.login(SMTP_USER, SMTP_PASS)
+        except Exception:
+            server.close()
+            raise
+        self.server = server
+
+    def close(self):
+        """
+        Closes the SMTP connection if one is open.
+
+        Returns:
+            None
+        """
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except OSError:
+            # quit() leaves the socket open when the QUIT command fails
+            self.server.close()
+        finally:
+            self.server = None
+
+    def send_message(self, msg):
+        """
+        Sends an email message over the session, (re)connecting if needed.
+
+        Parameters:
+            msg (EmailMessage): The message to send.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            try:
+                if self.server is None:
+                    self.connect()
+                else:
+                    try:
+                        self.server.noop()
+                    except smtplib.SMTPServerDisconnected:
+                        self.connect()
+                self.server.send_message(msg)
+                print(f"Email sent to {msg['To']}")
+            except smtplib.SMTPServerDisconnected as e:
+                self.close()
+                print(f"Failed to send email: {e}")
+            except smtplib.SMTPException as e:
+                # Errors about this message only (e.g. refused recipients), the session is kept
+                print(f"Failed to send email: {e}")
+            except OSError as e:
+                self.close()
+                print(f"Failed to send email: {e}")
+            except Exception as e:
+                print(f"Failed to send email: {e}")
+
+
+# Session used by send_email when called outside of a batch
+smtp_session = SmtpSession()
+
+
+class ProjectLogHandler(logging.Handler):
+    """
+    Dispatches log records to the file handler of the project they belong to.
+
+    Used by the log listener thread, which receives the records of every project logger through
+    a single queue. Records are routed by the log file of their project, so projects whose names
+    map to the same file share its handler.
+    """
+
+    def __init__(self, file_handlers, log_paths):
+        super().__init__()
+        self.file_handlers = file_handlers
+        self.log_paths = log_paths
+
+    def emit(self, record):
+        handler = self.file_handlers.get(self.log_paths.get(record.name))
+        if handler is not None:
+            handler.handle(record)
+
+
+class ProjectFileHandler(TimedRotatingFileHandler):
+    """
+    A project log file, rotated at midnight, whose records are buffered for the whole cycle.
+
+    Only the last LOG_RETENTION_DAYS rotated files are kept, older ones are deleted on rollover.
+
+    Records are not flushed one by one; flush_project_logs writes each file's buffer in a single
+    call once the cycle is over. The buffer is also written when the file is rotated or closed.
+    """
+
+    def __init__(self, filename):
+        super().__init__(
+            filename,
+            when="midnight",
+            backupCount=LOG_RETENTION_DAYS,
+            encoding="utf-8",
+        )
+
+    def flush(self):
+        # Called after every record, buffering is handled by write_buffer instead
+        pass
+
+    def write_buffer(self):
+        """
+        Writes the buffered records to the log file.
+
+        Returns:
+            None
+        """
+        super().flush()
+
+
+# When the logs directory is due for the next clean_old_logs sweep
+log_sweep = {}
+
+# Parsed request configurations, reloaded when the CSV file changes
+config_cache = {}
+
+# Consecutive failures of unreachable endpoints, and how many cycles they are skipped for,
+# keyed by backoff_key
+failure_state = {}
+failure_state_lock = threading.Lock()
+
+# Formatter shared by every project log file
+LOG_FORMATTER = logging.Formatter("%(asctime)s %(message)s")
+
+# Per-project loggers, configured once per process. Loggers only enqueue their records, which
+# log_listener writes to the matching file handler in a background thread.
+project_loggers = {}
+project_log_paths = {}  # Log file path of each project
+project_log_handlers = {}  # File handler of each log file path
+project_loggers_lock = threading.Lock()
+log_queue = queue.Queue(-1)
+log_listener = QueueListener(
+    log_queue, ProjectLogHandler(project_log_handlers, project_log_paths)
+)
+
+
+# Parsed once, so From isn't parsed again for every email
+FROM_HEADER = email_policy.header_factory("From", SMTP_FROM)
+
+
+@functools.lru_cache(maxsize=256)
+def to_header(recipients):
+    """
+    Parses a To header, caching the result since each project notifies the same recipients.
+
+    Parameters:
+        recipients (str): The comma-separated email addresses.
+
+    Returns:
+        email.headerregistry.AddressHeader: The parsed header.
+    """
+    return email_policy.header_factory("To", recipients)
+
+
+def build_email(to_emails, subject, body):
+    """
+    Builds an email message for the specified recipients with the given subject and body.
+
+    The From and To headers are parsed objects reused across messages, which EmailMessage stores
+    as they are instead of parsing their value again.
 
     Parameters:
         to_emails (list): A list of email addresses to send the email to.
@@ -37,90 +309,205 @@ def send_email(to_emails, subject, body):
         body (str): The content of the email.
 
     Returns:
-        None
+        EmailMessage: The email message.
     """
     msg = EmailMessage()
-    msg["From"] = SMTP_FROM
-    msg["To"] = ", ".join(to_emails)
+    msg["From"] = FROM_HEADER
+    msg["To"] = to_header(", ".join(to_emails))
     msg["Subject"] = subject
     msg.set_content(body)
+    return msg
+
 
+def send_email(to_emails, subject, body):
+    """
+    Sends an email to the specified recipients with the given subject and body.
+
+    Parameters:
+        to_emails (list): A list of email addresses to send the email to.
+        subject (str): The subject of the email.
+        body (str): The content of the email.
+
+    Returns:
+        None
+    """
+    smtp_session.send_message(build_email(to_emails, subject, body))
+
+
+def prepare_request(method, url, headers, body=None):
+    """
+    Prepares an HTTP request on the shared HTTP session, so it can be sent on every cycle.
+
+    Parameters:
+        method (str): The HTTP method.
+        url (str): The request endpoint.
+        headers (dict): The request headers.
+        body (object): The request body, sent as JSON. Default is None.
+
+    Returns:
+        requests.PreparedRequest: The prepared request, or None if it can't be prepared (e.g., an
+        invalid endpoint or headers that aren't a JSON object). The error is then reported when the
+        request is made.
+    """
     try:
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASS)
-            server.send_message(msg)
-            print(f"Email sent to {', '.join(to_emails)}")
-    except Exception as e:
-        print(f"Failed to send email: {e}")
+        return http_session.prepare_request(
+            requests.Request(method=method, url=url, headers=headers, json=body)
+        )
+    except Exception:
+        return None
+
+
+def send_request(prepared, **request_kwargs):
+    """
+    Sends a prepared request over the shared HTTP session.
+
+    Parameters:
+        prepared (requests.PreparedRequest): The prepared request, or None to build the request
+            from request_kwargs instead.
+        **request_kwargs: The arguments of requests.Session.request, used when prepared is None.
+
+    Returns:
+        requests.Response: The response.
+    """
+    if prepared is None:
+        return http_session.request(timeout=REQUEST_TIMEOUT, **request_kwargs)
+    # Apply the proxy and TLS settings from the environment, as Session.request does
+    settings = http_session.merge_environment_settings(
+        prepared.url, {}, None, None, None
+    )
+    return http_session.send(
+        prepared, timeout=REQUEST_TIMEOUT, allow_redirects=True, **settings
+    )
 
 
 def read_requests_csv(file_path):
     """
-    Reads a CSV file containing request configurations and returns a list of dictionaries.
+    Reads a CSV file containing request configurations and yields them one row at a time.
+
+    The header is checked once: if a column of REQUIRED_CSV_COLUMNS is missing, an
+    InvalidCsvHeaderError is raised. Missing optional columns, like empty values, fall back to their defaults.
 
-    Each dictionary represents a request configuration with the following keys:
+    Each RequestConfig represents a request configuration with the following fields:
     - client: The client name
     - project_name: The project name
     - endpoint: The request endpoint
     - expected_http_status: The expected HTTP status code
-    - notify_emails: A list of email addresses to notify
+    - notify_emails: A tuple of email addresses to notify
     - body: The request body
     - headers: The request headers
     - http_method: The HTTP method (e.g., GET, POST, PUT, DELETE)
+    - probe_method: The HTTP method of a lighter request tried first (e.g., HEAD), defaulting to
+      http_method
+    - prepared_request: The request, prepared once so it is not rebuilt on every cycle
+    - prepared_probe: The probe request, prepared once, or None without a probe_method
 
     Parameters:
     file_path (str): The path to the CSV file containing request configurations
 
-    Returns:
-    list: A list of dictionaries representing the request configurations
+    Yields:
+    RequestConfig: A request configuration
+
+    Raises:
+    InvalidCsvHeaderError: If a required column is missing from the header
     """
-    request_configs = []
     with open(file_path, "r", newline="", encoding="utf-8") as csvfile:
-        reader = csv.DictReader(csvfile, delimiter=";")
+        reader = csv.reader(csvfile, delimiter=";")
+        header = next(reader, [])
+        missing = [name for name in REQUIRED_CSV_COLUMNS if name not in header]
+        if missing:
+            raise InvalidCsvHeaderError(
+                f"Missing required columns in {file_path}: {', '.join(missing)}"
+            )
+
+        # Optional missing columns point past the last column, to a slot that is always empty
+        columns = {name: i for i, name in enumerate(header)}
+        width = len(header) + 1
+        (
+            i_client,
+            i_project_name,
+            i_endpoint,
+            i_expected_http_status,
+            i_notify_emails,
+            i_headers_json,
+            i_body_json,
+            i_http_method,
+            i_probe_method,
+        ) = (columns.get(name, len(header)) for name in CSV_COLUMNS)
+
         for row in reader:
+            if not row:
+                continue
+            # Drop extra fields so the slot of missing columns stays empty
+            row = row[: len(header)]
+            row.extend([""] * (width - len(row)))
+
+            headers_json = row[i_headers_json]
             try:
-                headers = (
-                    json.loads(row.get("headers_json", "{}"))
-                    if row.get("headers_json")
-                    else {}
-                )
+                headers = json_loads(headers_json) if headers_json else {}
             except json.JSONDecodeError:
                 print(f"Invalid headers_json in row: {row}")
                 headers = {}
 
+            body_json = row[i_body_json]
             try:
-                body = (
-                    json.loads(row.get("body_json", ""))
-                    if row.get("body_json")
-                    else None
-                )
+                body = json_loads(body_json) if body_json else None
             except json.JSONDecodeError:
                 print(f"Invalid body_json in row: {row}")
                 body = None
 
-            emails = [
-                email.strip()
-                for email in row.get("notify_emails", "").split(",")
-                if email.strip()
-            ]
-            expected_status = int(row.get("expected_http_status", 200))
-            http_method = row.get("http_method", "GET").upper()
-            project_name = row.get("project_name", "default_project")
-            client = row.get("client", "")
-
-            config = {
-                "client": client,
-                "project_name": project_name,
-                "endpoint": row.get("endpoint"),
-                "expected_http_status": expected_status,
-                "notify_emails": emails,
-                "body": body,
-                "headers": headers,
-                "http_method": http_method,
-            }
-            request_configs.append(config)
-    return request_configs
+            emails = tuple(
+                email
+                for email in EMAIL_SEPARATORS.split(row[i_notify_emails].strip())
+                if email
+            )
+            try:
+                expected_status = int(row[i_expected_http_status] or 200)
+            except ValueError:
+                print(f"Invalid expected_http_status in row: {row}")
+                expected_status = 200
+            http_method = row[i_http_method].upper() or "GET"
+            probe_method = row[i_probe_method].upper() or http_method
+            project_name = row[i_project_name] or "default_project"
+
+            endpoint = row[i_endpoint]
+            prepared_probe = None
+            if probe_method != http_method:
+                prepared_probe = prepare_request(probe_method, endpoint, headers)
+
+            yield RequestConfig(
+                client=row[i_client],
+                project_name=project_name,
+                endpoint=endpoint,
+                expected_http_status=expected_status,
+                notify_emails=emails,
+                body=body,
+                headers=headers,
+                http_method=http_method,
+                probe_method=probe_method,
+                prepared_request=prepare_request(http_method, endpoint, headers, body),
+                prepared_probe=prepared_probe,
+            )
+
+
+def load_request_configs(file_path):
+    """
+    Returns the request configurations of a CSV file, parsing it only when it has changed.
+
+    The parsed configurations are kept in config_cache along with the file's modification time and
+    size, so an unchanged file is not read again on the next cycle.
+
+    Parameters:
+        file_path (str): The path to the CSV file containing request configurations.
+
+    Returns:
+        list: A list of RequestConfig representing the request configurations.
+    """
+    stat = os.stat(file_path)
+    key = (file_path, stat.st_mtime_ns, stat.st_size)
+    if config_cache.get("key") != key:
+        config_cache["configs"] = list(read_requests_csv(file_path))
+        config_cache["key"] = key
+    return config_cache["configs"]
 
 
 def ensure_log_dir():
@@ -140,119 +527,335 @@ def ensure_log_dir():
         os.makedirs(LOGS_DIR)
 
 
+@functools.lru_cache(maxsize=1024)
 def sanitize_filename(name):
     """
     Sanitizes a filename by replacing non-alphanumeric characters with underscores.
 
+    ASCII names, the common case, are handled by str.translate. Results are cached since the same
+    project names are sanitized on every cycle.
+
     Parameters:
         name (str): The filename to be sanitized.
 
     Returns:
         str: The sanitized filename.
     """
+    if name.isascii():
+        return name.translate(FILENAME_TRANSLATION)
     return "".join(c if c.isalnum() else "_" for c in name)
 
 
-def clean_old_logs(log_dir, max_age_days=30):
+def clean_old_logs(log_dir, max_age_days=LOG_RETENTION_DAYS):
     """
     Deletes old log files from the specified directory.
 
+    Rotation already prunes the logs of active projects, so this mostly catches the logs of
+    projects that were removed from the CSV file.
+
     Parameters:
         log_dir (str): The directory containing log files to be cleaned.
-        max_age_days (int): The maximum age of log files in days. Default is 30.
+        max_age_days (int): The maximum age of log files in days. Default is LOG_RETENTION_DAYS.
 
     Returns:
         None
     """
-    now = datetime.now()
-    for filename in os.listdir(log_dir):
-        file_path = os.path.join(log_dir, filename)
-        if os.path.isfile(file_path):
-            file_modified = datetime.fromtimestamp(os.path.getmtime(file_path))
-            if (now - file_modified) > timedelta(days=max_age_days):
-                os.remove(file_path)
-                print(f"Deleted old log file: {file_path}")
+    cutoff = time.time() - max_age_days * 24 * 60 * 60
+    with os.scandir(log_dir) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                print(f"Deleted old log file: {entry.path}")
 
 
-def execute_requests():
+def get_project_logger(project_name):
     """
-    Executes a series of HTTP requests based on configurations read from a CSV file.
+    Returns the logger for a project, creating and configuring it on first use.
 
-    The function reads request configurations from the REQUESTS_CSV file, sets up logging for each project,
-    and sends HTTP requests according to the configurations. It also checks the response status code and
-    sends email notifications if the status code is unexpected or if an error occurs during the request.
+    The logger enqueues its records on log_queue, and log_listener writes them to a file named
+    after the project in the LOGS_DIR directory. The file is rotated at midnight, and the logger is
+    cached so its file is only opened once per process.
 
-    The function returns None.
-    """
-    print(f"Executing requests at {datetime.now().isoformat()}")
-    ensure_log_dir()
-    clean_old_logs(LOGS_DIR)
+    Parameters:
+        project_name (str): The project name.
 
-    request_configs = read_requests_csv(REQUESTS_CSV)
-    total_projects = len(request_configs)
-    projects_in_alert = 0
+    Returns:
+        logging.Logger: The project logger.
+    """
+    with project_loggers_lock:
+        logger = project_loggers.get(project_name)
+        if logger is not None:
+            return logger
 
-    for config in request_configs:
-        project_log_filename = f"{sanitize_filename(config['project_name'])}.log"
+        project_log_filename = f"{sanitize_filename(project_name)}.log"
         project_log_path = os.path.join(LOGS_DIR, project_log_filename)
 
-        logger = logging.getLogger(config["project_name"])
+        logger = logging.getLogger(project_name)
         logger.setLevel(logging.INFO)
-        # Remove previous handlers
-        if logger.hasHandlers():
+        # Dotted names (e.g. "Shop.API") would otherwise also enqueue through their parent
+        logger.propagate = False
+        # Names sanitized to the same file share one handler, so only one of them rotates it
+        if project_log_path not in project_log_handlers:
+            handler = ProjectFileHandler(project_log_path)
+            handler.setFormatter(LOG_FORMATTER)
+            project_log_handlers[project_log_path] = handler
+        logger.addHandler(QueueHandler(log_queue))
+
+        project_log_paths[project_name] = project_log_path
+        project_loggers[project_name] = logger
+        return logger
+
+
+def flush_project_logs():
+    """
+    Writes the records buffered by the project log files during the cycle.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    with project_loggers_lock:
+        for handler in project_log_handlers.values():
+            handler.write_buffer()
+
+
+def close_project_loggers():
+    """
+    Closes the file handlers of all cached project loggers and empties the cache.
+
+    The log listener must not be running, so no queued record is written to a closed file.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+    with project_loggers_lock:
+        for logger in project_loggers.values():
             logger.handlers.clear()
-        handler = logging.FileHandler(project_log_path)
-        formatter = logging.Formatter("%(asctime)s %(message)s")
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+        for handler in project_log_handlers.values():
+            handler.close()
+        project_loggers.clear()
+        project_log_paths.clear()
+        project_log_handlers.clear()
+
+
+def backoff_key(config):
+    """
+    Returns the key of a request configuration in failure_state.
+
+    Rows checking the same endpoint with another method or for another project get their own
+    backoff, and the key stays the same when the CSV file is reloaded.
+
+    Parameters:
+        config (RequestConfig): A request configuration.
+
+    Returns:
+        tuple: The key of the configuration.
+    """
+    return (config.client, config.project_name, config.http_method, config.endpoint)
+
+
+def in_backoff(config):
+    """
+    Checks whether the unreachable endpoint of a configuration should be skipped this cycle.
+
+    Each call for a configuration in backoff consumes one of its skipped cycles.
+
+    Parameters:
+        config (RequestConfig): A request configuration.
+
+    Returns:
+        bool: True if the request should be skipped, False otherwise.
+    """
+    with failure_state_lock:
+        state = failure_state.get(backoff_key(config))
+        if state is None or state["skip_cycles"] == 0:
+            return False
+        state["skip_cycles"] -= 1
+        return True
 
-        logger.info(
-            f"Starting request for {config['client']} - {config['project_name']}"
+
+def record_failure(config):
+    """
+    Records a failed request of a configuration and backs off exponentially.
+
+    After n consecutive failures, the request is skipped for 2^(n-1) - 1 cycles, up to
+    MAX_BACKOFF_CYCLES.
+
+    Parameters:
+        config (RequestConfig): A request configuration.
+
+    Returns:
+        None
+    """
+    with failure_state_lock:
+        state = failure_state.setdefault(
+            backoff_key(config), {"fail_count": 0, "skip_cycles": 0}
+        )
+        state["fail_count"] += 1
+        state["skip_cycles"] = min(
+            2 ** min(state["fail_count"] - 1, 16) - 1, MAX_BACKOFF_CYCLES
         )
 
-        try:
-            response = requests.request(
-                method=config["http_method"],
-                url=config["endpoint"],
-                headers=config["headers"],
-                json=config["body"],
-                timeout=10,
+
+def record_success(config):
+    """
+    Clears the failures recorded for a configuration once its endpoint responds again.
+
+    Parameters:
+        config (RequestConfig): A request configuration.
+
+    Returns:
+        None
+    """
+    with failure_state_lock:
+        failure_state.pop(backoff_key(config), None)
+
+
+def run_request(config):
+    """
+    Executes a single HTTP request described by a request configuration.
+
+    The result is written to the project log. When the status code is unexpected or an error occurs
+    during the request, an email notification is built for the configured recipients. Endpoints
+    that keep failing to respond are skipped for an increasing number of cycles, and stay in alert
+    while skipped.
+
+    When the configuration has a probe_method other than its http_method, a probe request without
+    body is sent first. If it answers with the expected status, the full request is skipped;
+    otherwise (e.g., 405 Method Not Allowed) the full request is sent and its status is checked.
+
+    Parameters:
+        config (RequestConfig): A request configuration as returned by read_requests_csv.
+
+    Returns:
+        tuple: (in_alert, email) where in_alert is True if the project is in alert and email is the
+        EmailMessage to send, or None if there is nothing to notify.
+    """
+    logger = get_project_logger(config.project_name)
+
+    if in_backoff(config):
+        logger.info(f"Skipping request to {config.endpoint} after consecutive failures")
+        return True, None
+
+    logger.info(f"Starting request for {config.client} - {config.project_name}")
+
+    in_alert = False
+    email = None
+    try:
+        response = None
+        if config.probe_method != config.http_method:
+            probe = send_request(
+                config.prepared_probe,
+                method=config.probe_method,
+                url=config.endpoint,
+                headers=config.headers,
             )
-            status_code = response.status_code
             logger.info(
-                f"Request to {config['endpoint']} completed with status {status_code}"
+                f"{config.probe_method} probe to {config.endpoint} completed with status "
+                f"{probe.status_code}"
+            )
+            if probe.status_code == config.expected_http_status:
+                response = probe
+        if response is None:
+            response = send_request(
+                config.prepared_request,
+                method=config.http_method,
+                url=config.endpoint,
+                headers=config.headers,
+                json=config.body,
+            )
+        record_success(config)
+        status_code = response.status_code
+        logger.info(f"Request to {config.endpoint} completed with status {status_code}")
+
+        if status_code != config.expected_http_status:
+            error_msg = (
+                f"Unexpected status code: Expected {config.expected_http_status}, "
+                f"got {status_code}"
             )
-
-            if status_code != config["expected_http_status"]:
-                error_msg = (
-                    f"Unexpected status code: Expected {config['expected_http_status']}, "
-                    f"got {status_code}"
-                )
-                logger.error(error_msg)
-                projects_in_alert += 1
-                if config["notify_emails"]:
-                    send_email(
-                        to_emails=config["notify_emails"],
-                        subject=f"Unexpected status code from {config['endpoint']}",
-                        body=error_msg,
-                    )
-        except Exception as e:
-            error_msg = f"Error during request to {config['endpoint']}: {e}"
             logger.error(error_msg)
-            projects_in_alert += 1
-            if config["notify_emails"]:
-                send_email(
-                    to_emails=config["notify_emails"],
-                    subject=f"Error during request to {config['endpoint']}",
+            in_alert = True
+            if config.notify_emails:
+                email = build_email(
+                    to_emails=config.notify_emails,
+                    subject=f"Unexpected status code from {config.endpoint}",
                     body=error_msg,
                 )
-        finally:
-            logger.info(
-                f"Finished request for {config['client']} - {config['project_name']}"
+    except Exception as e:
+        error_msg = f"Error during request to {config.endpoint}: {e}"
+        logger.error(error_msg)
+        record_failure(config)
+        in_alert = True
+        if config.notify_emails:
+            email = build_email(
+                to_emails=config.notify_emails,
+                subject=f"Error during request to {config.endpoint}",
+                body=error_msg,
             )
+    finally:
+        logger.info(f"Finished request for {config.client} - {config.project_name}")
+
+    return in_alert, email
+
+
+def execute_requests():
+    """
+    Executes a series of HTTP requests based on configurations read from a CSV file.
+
+    The function loads request configurations from the REQUESTS_CSV file and runs each of them
+    concurrently through run_request, using a thread pool of MAX_WORKERS threads and a shared
+    HTTP session, while log_listener writes the project logs in the background. Email
+    notifications collected during the cycle are then sent over a single SMTP session, and a
+    summary of the cycle, stamped with its start time, is appended to the RESUME_LOG_FILE. If the
+    configurations can't be loaded, the error is recorded in the RESUME_LOG_FILE instead.
+
+    The function returns None.
+    """
+    started_at = datetime.now().isoformat()
+    print(f"Executing requests at {started_at}")
+    ensure_log_dir()
+    if time.monotonic() >= log_sweep.get("next_at", float("-inf")):
+        clean_old_logs(LOGS_DIR)
+        log_sweep["next_at"] = time.monotonic() + LOG_SWEEP_INTERVAL
+
+    try:
+        request_configs = load_request_configs(REQUESTS_CSV)
+    except InvalidCsvHeaderError as e:
+        summary = f"{started_at} | ERROR | Failed to load {REQUESTS_CSV}: {e}\n"
+        with open(RESUME_LOG_FILE, "a") as resume_log:
+            resume_log.write(summary)
+        print(summary)
+        return
+    total_projects = len(request_configs)
+
+    log_listener.start()
+    try:
+        # Don't start more threads than there are checks to run
+        max_workers = max(1, min(MAX_WORKERS, total_projects))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(run_request, config) for config in request_configs
+            ]
+            results = [future.result() for future in futures]
+    finally:
+        # Wait for the queued project log records, then write them out
+        log_listener.stop()
+        flush_project_logs()
+    projects_in_alert = sum(in_alert for in_alert, _ in results)
+
+    pending_emails = [email for _, email in results if email is not None]
+    if pending_emails:
+        with SmtpSession() as smtp:
+            for msg in pending_emails:
+                smtp.send_message(msg)
 
     # Write summary to resume log
-    summary = f"{datetime.now().isoformat()} | {total_projects} analysed projects | {projects_in_alert} projects in alert\n"
+    summary = f"{started_at} | {total_projects} analysed projects | {projects_in_alert} projects in alert\n"
     with open(RESUME_LOG_FILE, "a") as resume_log:
         resume_log.write(summary)
     print(summary)
@@ -260,9 +863,12 @@ def execute_requests():
 
 def scheduler():
     """
-    Executes the `execute_requests` function and schedules a new timer to call `scheduler` again after the specified interval.
+    Executes the `execute_requests` function every CHECK_INTERVAL seconds.
 
-    This function is used to create a recurring task that periodically executes the `execute_requests` function. It starts by calling `execute_requests` immediately and then schedules a new timer using `threading.Timer` to call `scheduler` again after the specified interval.
+    This function runs a single long-lived loop that calls `execute_requests` immediately and then at
+    fixed intervals measured from the start time, so the schedule does not drift by the duration of
+    each execution. If an execution overruns the interval, the next one starts right away and the
+    schedule restarts from that point instead of running the missed executions back to back.
 
     Parameters:
     None
@@ -270,8 +876,12 @@ def scheduler():
     Returns:
     None
     """
-    execute_requests()
-    threading.Timer(CHECK_INTERVAL, scheduler).start()
+    next_run = time.monotonic()
+    while True:
+        execute_requests()
+        now = time.monotonic()
+        next_run = max(next_run + CHECK_INTERVAL, now)
+        time.sleep(next_run - now)
 
 
 if __name__ == "__main__":
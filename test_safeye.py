@@ -1,17 +1,59 @@
 import unittest
 from unittest.mock import patch, mock_open, MagicMock, call
 import json
+import logging
 import os
+import smtplib
+import tempfile
+import requests
 from datetime import datetime, timedelta
+from http.client import HTTPMessage
+from logging.handlers import QueueHandler
+from requests.cookies import extract_cookies_to_jar
 from safeye import (
+    InvalidCsvHeaderError,
+    ProjectFileHandler,
+    ProjectLogHandler,
+    RequestConfig,
+    SmtpSession,
+    build_email,
     send_email,
     read_requests_csv,
     ensure_log_dir,
     sanitize_filename,
     clean_old_logs,
+    close_project_loggers,
+    config_cache,
+    failure_state,
+    load_request_configs,
+    log_queue,
+    log_sweep,
+    get_project_logger,
+    http_session,
+    project_log_handlers,
+    project_log_paths,
     execute_requests,
+    run_request,
+    scheduler,
 )
 
+TEST_CONFIG = RequestConfig(
+    client="TestClient",
+    project_name="TestProject",
+    endpoint="http://example.com",
+    expected_http_status=200,
+    notify_emails=("test@example.com",),
+    headers={},
+    body=None,
+    http_method="GET",
+    probe_method="GET",
+)
+
+
+def make_config(**overrides):
+    # Request configuration used by the tests, with only the given fields changed
+    return TEST_CONFIG._replace(**overrides)
+
 
 class TestSafeye(unittest.TestCase):
 
@@ -20,11 +62,15 @@ class TestSafeye(unittest.TestCase):
         pass
 
     def tearDown(self):
-        # Clean up after tests if needed
-        pass
+        # Drop cached project loggers and configurations between tests
+        close_project_loggers()
+        config_cache.clear()
+        failure_state.clear()
+        log_sweep.clear()
 
+    @patch("safeye.smtp_session", new_callable=SmtpSession)
     @patch("smtplib.SMTP")
-    def test_send_email(self, mock_smtp):
+    def test_send_email(self, mock_smtp, mock_session):
         # Test the send_email function
         to_emails = ["test@example.com"]
         subject = "Test Subject"
@@ -33,7 +79,78 @@ class TestSafeye(unittest.TestCase):
         send_email(to_emails, subject, body)
 
         mock_smtp.assert_called_once_with("smtp.example.com", 587)
-        mock_smtp.return_value.__enter__.return_value.send_message.assert_called_once()
+        mock_smtp.return_value.send_message.assert_called_once()
+
+    def test_http_session_ignores_cookies(self):
+        request = requests.Request("GET", "http://example.com/").prepare()
+        headers = HTTPMessage()
+        headers["Set-Cookie"] = "session=abc; Path=/"
+        response = MagicMock()
+        response._original_response.msg = headers
+
+        extract_cookies_to_jar(http_session.cookies, request, response)
+
+        self.assertEqual(len(http_session.cookies), 0)
+
+    def test_build_email(self):
+        msg = build_email(["a@example.com", "b@example.com"], "Subject", "Body")
+        same_recipients = build_email(["a@example.com", "b@example.com"], "Other", "")
+
+        self.assertEqual(msg["From"], "sender@example.com")
+        self.assertEqual(msg["To"], "a@example.com, b@example.com")
+        self.assertEqual(msg["Subject"], "Subject")
+        self.assertEqual(msg.get_content(), "Body\n")
+        self.assertIs(msg["To"], same_recipients["To"])
+
+    @patch("smtplib.SMTP")
+    def test_smtp_session_closes_failed_login(self, mock_smtp):
+        server = mock_smtp.return_value
+        server.login.side_effect = smtplib.SMTPAuthenticationError(535, b"Denied")
+
+        with SmtpSession() as smtp:
+            smtp.send_message(MagicMock())
+            self.assertIsNone(smtp.server)
+
+        server.close.assert_called_once()
+        server.send_message.assert_not_called()
+
+    @patch("smtplib.SMTP")
+    def test_smtp_session_send_errors(self, mock_smtp):
+        server = mock_smtp.return_value
+        server.noop.return_value = (250, b"OK")
+        server.send_message.side_effect = [
+            smtplib.SMTPRecipientsRefused({}),
+            OSError("Connection reset"),
+            None,
+        ]
+
+        with SmtpSession() as smtp:
+            # A refused message keeps the session
+            smtp.send_message(MagicMock())
+            self.assertIs(smtp.server, server)
+            # A socket error closes it, the next message reconnects
+            smtp.send_message(MagicMock())
+            self.assertIsNone(smtp.server)
+            smtp.send_message(MagicMock())
+
+        self.assertEqual(mock_smtp.call_count, 2)
+        self.assertEqual(server.quit.call_count, 2)
+
+    @patch("smtplib.SMTP")
+    def test_smtp_session_reuses_connection(self, mock_smtp):
+        server = mock_smtp.return_value
+        server.noop.side_effect = [(250, b"OK"), smtplib.SMTPServerDisconnected()]
+
+        with SmtpSession() as smtp:
+            smtp.send_message(MagicMock())
+            smtp.send_message(MagicMock())
+            smtp.send_message(MagicMock())
+
+        # One connection for the first two messages, a reconnect after the drop
+        self.assertEqual(mock_smtp.call_count, 2)
+        self.assertEqual(server.login.call_count, 2)
+        self.assertEqual(server.send_message.call_count, 3)
+        server.quit.assert_called()
 
     @patch(
         "builtins.open",
@@ -41,16 +158,92 @@ class TestSafeye(unittest.TestCase):
         read_data='client;project_name;endpoint;expected_http_status;notify_emails;headers_json;body_json;http_method\nTestClient;TestProject;http://example.com;200;test@example.com;{"Content-Type": "application/json"};{"key": "value"};GET',
     )
     def test_read_requests_csv(self, mock_file):
-        result = read_requests_csv("dummy_path")
+        result = list(read_requests_csv("dummy_path"))
         self.assertEqual(len(result), 1)
-        self.assertEqual(result[0]["client"], "TestClient")
-        self.assertEqual(result[0]["project_name"], "TestProject")
-        self.assertEqual(result[0]["endpoint"], "http://example.com")
-        self.assertEqual(result[0]["expected_http_status"], 200)
-        self.assertEqual(result[0]["notify_emails"], ["test@example.com"])
-        self.assertEqual(result[0]["headers"], {"Content-Type": "application/json"})
-        self.assertEqual(result[0]["body"], {"key": "value"})
-        self.assertEqual(result[0]["http_method"], "GET")
+        self.assertEqual(result[0].client, "TestClient")
+        self.assertEqual(result[0].project_name, "TestProject")
+        self.assertEqual(result[0].endpoint, "http://example.com")
+        self.assertEqual(result[0].expected_http_status, 200)
+        self.assertEqual(result[0].notify_emails, ("test@example.com",))
+        self.assertEqual(result[0].headers, {"Content-Type": "application/json"})
+        self.assertEqual(result[0].body, {"key": "value"})
+        self.assertEqual(result[0].http_method, "GET")
+        self.assertEqual(result[0].prepared_request.method, "GET")
+        self.assertEqual(result[0].prepared_request.url, "http://example.com/")
+        self.assertEqual(
+            result[0].prepared_request.headers["Content-Type"], "application/json"
+        )
+        self.assertEqual(result[0].prepared_request.body, b'{"key": "value"}')
+        self.assertIsNone(result[0].prepared_probe)
+
+    @patch(
+        "builtins.open",
+        new_callable=mock_open,
+        read_data="endpoint;notify_emails\nhttp://example.com\n\nhttp://example.org; John Doe <a@example.com>,, b@example.com ",
+    )
+    def test_read_requests_csv_defaults(self, mock_file):
+        result = list(read_requests_csv("dummy_path"))
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result[0].client, "")
+        self.assertEqual(result[0].project_name, "default_project")
+        self.assertEqual(result[0].endpoint, "http://example.com")
+        self.assertEqual(result[0].expected_http_status, 200)
+        self.assertEqual(result[0].notify_emails, ())
+        self.assertEqual(result[0].headers, {})
+        self.assertIsNone(result[0].body)
+        self.assertEqual(result[0].http_method, "GET")
+        self.assertEqual(result[0].probe_method, "GET")
+        self.assertEqual(
+            result[1].notify_emails, ("John Doe <a@example.com>", "b@example.com")
+        )
+
+    @patch(
+        "builtins.open",
+        new_callable=mock_open,
+        read_data='client;project_name;endpoint;expected_http_status;notify_emails;headers_json;body_json;http_method\nTestClient;TestProject;http://example.com;200;test@example.com;{invalid;{"key": ;GET',
+    )
+    def test_read_requests_csv_invalid_json(self, mock_file):
+        result = list(read_requests_csv("dummy_path"))
+        self.assertEqual(result[0].headers, {})
+        self.assertIsNone(result[0].body)
+
+    def test_project_file_handler(self):
+        with tempfile.TemporaryDirectory() as log_dir:
+            log_path = os.path.join(log_dir, "project.log")
+            handler = ProjectFileHandler(log_path)
+            record = logging.LogRecord(
+                "project", logging.INFO, __file__, 0, "message", None, None
+            )
+
+            handler.handle(record)
+            handler.handle(record)
+            self.assertEqual(os.path.getsize(log_path), 0)
+
+            handler.write_buffer()
+            with open(log_path) as log_file:
+                self.assertEqual(log_file.read(), "message\nmessage\n")
+            handler.close()
+
+    @patch("safeye.read_requests_csv")
+    def test_load_request_configs(self, mock_read_csv):
+        mock_read_csv.return_value = iter([make_config()])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, "requests.csv")
+            with open(csv_path, "w") as csv_file:
+                csv_file.write("header\n")
+
+            first = load_request_configs(csv_path)
+            second = load_request_configs(csv_path)
+            self.assertEqual(first, [make_config()])
+            self.assertIs(first, second)
+            mock_read_csv.assert_called_once_with(csv_path)
+
+            # A modified file is parsed again
+            mock_read_csv.return_value = iter([])
+            with open(csv_path, "a") as csv_file:
+                csv_file.write("row\n")
+            self.assertEqual(load_request_configs(csv_path), [])
+            self.assertEqual(mock_read_csv.call_count, 2)
 
     @patch("os.path.exists")
     @patch("os.makedirs")
@@ -63,56 +256,96 @@ class TestSafeye(unittest.TestCase):
         self.assertEqual(sanitize_filename("test file.log"), "test_file_log")
         self.assertEqual(sanitize_filename("test@file.log"), "test_file_log")
         self.assertEqual(sanitize_filename("test123"), "test123")
+        self.assertEqual(sanitize_filename("café/ação"), "café_ação")
 
-    @patch("os.listdir")
-    @patch("os.path.isfile")
-    @patch("os.path.getmtime")
-    @patch("os.remove")
-    def test_clean_old_logs(
-        self, mock_remove, mock_getmtime, mock_isfile, mock_listdir
-    ):
-        mock_listdir.return_value = ["old_log.log", "new_log.log"]
-        mock_isfile.return_value = True
-        mock_getmtime.side_effect = [
-            (datetime.now() - timedelta(days=31)).timestamp(),
-            datetime.now().timestamp(),
-        ]
+    def test_clean_old_logs(self):
+        with tempfile.TemporaryDirectory() as log_dir:
+            old_log = os.path.join(log_dir, "old_log.log")
+            new_log = os.path.join(log_dir, "new_log.log")
+            for path in (old_log, new_log):
+                with open(path, "w"):
+                    pass
+            old_mtime = (datetime.now() - timedelta(days=31)).timestamp()
+            os.utime(old_log, (old_mtime, old_mtime))
+            os.mkdir(os.path.join(log_dir, "subdir"))
 
-        clean_old_logs("dummy_log_dir")
+            clean_old_logs(log_dir)
 
-        mock_remove.assert_called_once_with("dummy_log_dir/old_log.log")
+            self.assertEqual(sorted(os.listdir(log_dir)), ["new_log.log", "subdir"])
+
+    @patch("builtins.open", new_callable=mock_open)
+    def test_get_project_logger(self, mock_file):
+        logger = get_project_logger("Test Project")
+
+        self.assertIs(get_project_logger("Test Project"), logger)
+        self.assertIs(get_project_logger("Test Project"), logger)
+        self.assertEqual(len(logger.handlers), 1)
+        self.assertIsInstance(logger.handlers[0], QueueHandler)
+        log_path = os.path.join("logs", "Test_Project.log")
+        self.assertTrue(project_log_handlers[log_path].baseFilename.endswith(log_path))
+        mock_file.assert_called_once()
 
-    @patch("safeye.read_requests_csv")
-    @patch("safeye.requests.request")
-    @patch("safeye.send_email")
+    @patch("builtins.open", new_callable=mock_open)
+    def test_get_project_logger_dotted_name(self, mock_file):
+        get_project_logger("Shop")
+        logger = get_project_logger("Shop.API")
+        queued = log_queue.qsize()
+
+        logger.info("message")
+
+        self.assertFalse(logger.propagate)
+        self.assertEqual(log_queue.qsize(), queued + 1)
+
+    @patch("builtins.open", new_callable=mock_open)
+    def test_get_project_logger_shared_file(self, mock_file):
+        get_project_logger("p ok")
+        get_project_logger("p-ok")
+
+        # Both names write to logs/p_ok.log through a single handler
+        self.assertEqual(list(project_log_handlers), [os.path.join("logs", "p_ok.log")])
+        mock_file.assert_called_once()
+
+        handler = project_log_handlers[os.path.join("logs", "p_ok.log")]
+        router = ProjectLogHandler(project_log_handlers, project_log_paths)
+        with patch.object(handler, "handle") as mock_handle:
+            for name in ("p ok", "p-ok"):
+                router.emit(
+                    logging.LogRecord(
+                        name, logging.INFO, __file__, 0, "msg", None, None
+                    )
+                )
+        self.assertEqual(mock_handle.call_count, 2)
+
+    @patch("safeye.load_request_configs")
+    @patch("safeye.http_session.request")
+    @patch("safeye.SmtpSession")
     @patch("builtins.open", new_callable=mock_open)
     @patch("safeye.datetime")
     def test_execute_requests(
-        self, mock_datetime, mock_file, mock_send_email, mock_request, mock_read_csv
+        self,
+        mock_datetime,
+        mock_file,
+        mock_smtp_session,
+        mock_request,
+        mock_load_configs,
     ):
         mock_datetime.now.return_value = datetime(2024, 9, 28, 22, 35, 22, 5085)
-        mock_read_csv.return_value = [
-            {
-                "client": "TestClient",
-                "project_name": "TestProject",
-                "endpoint": "http://example.com",
-                "expected_http_status": 200,
-                "notify_emails": ["test@example.com"],
-                "headers": {},
-                "body": None,
-                "http_method": "GET",
-            }
-        ]
+        mock_load_configs.return_value = [make_config()]
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_request.return_value = mock_response
 
         execute_requests()
 
+        mock_datetime.now.assert_called_once()
         mock_request.assert_called_once_with(
-            method="GET", url="http://example.com", headers={}, json=None, timeout=10
+            method="GET",
+            url="http://example.com",
+            headers={},
+            json=None,
+            timeout=(3.05, 7),
         )
-        mock_send_email.assert_not_called()
+        mock_smtp_session.assert_not_called()
 
         # Check that write was called 4 times
         self.assertEqual(mock_file().write.call_count, 4)
@@ -123,6 +356,229 @@ class TestSafeye(unittest.TestCase):
         )
         mock_file().write.assert_has_calls([call(expected_summary)], any_order=True)
 
+    @patch("safeye.load_request_configs", return_value=[])
+    @patch("safeye.clean_old_logs")
+    @patch("safeye.ensure_log_dir")
+    @patch("builtins.open", new_callable=mock_open)
+    def test_execute_requests_sweeps_logs_daily(
+        self, mock_file, mock_ensure_log_dir, mock_clean_old_logs, mock_load_configs
+    ):
+        execute_requests()
+        execute_requests()
+
+        mock_clean_old_logs.assert_called_once_with("logs")
+
+    @patch("safeye.http_session.request")
+    @patch("builtins.open", new_callable=mock_open)
+    def test_run_request_unexpected_status(self, mock_file, mock_request):
+        config = make_config()
+        mock_response = MagicMock()
+        mock_response.status_code = 500
+        mock_request.return_value = mock_response
+
+        in_alert, email = run_request(config)
+
+        self.assertTrue(in_alert)
+        self.assertEqual(email["To"], "test@example.com")
+        self.assertEqual(
+            email["Subject"], "Unexpected status code from http://example.com"
+        )
+        self.assertEqual(
+            email.get_content().strip(),
+            "Unexpected status code: Expected 200, got 500",
+        )
+
+    @patch(
+        "builtins.open",
+        new_callable=mock_open,
+        read_data="endpoint;expected_http_status\nhttp://example.com;200;extra note",
+    )
+    def test_read_requests_csv_extra_field(self, mock_file):
+        result = list(read_requests_csv("dummy_path"))
+        self.assertEqual(result[0].client, "")
+        self.assertEqual(result[0].project_name, "default_project")
+        self.assertEqual(result[0].endpoint, "http://example.com")
+        self.assertEqual(result[0].notify_emails, ())
+        self.assertEqual(result[0].headers, {})
+        self.assertIsNone(result[0].body)
+        self.assertEqual(result[0].http_method, "GET")
+        self.assertEqual(result[0].probe_method, "GET")
+
+    @patch(
+        "builtins.open",
+        new_callable=mock_open,
+        read_data="project_name;endpoint;expected_http_status\nBad;http://example.com;2OO\nGood;http://example.org;201",
+    )
+    def test_read_requests_csv_invalid_status(self, mock_file):
+        result = list(read_requests_csv("dummy_path"))
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result[0].expected_http_status, 200)
+        self.assertEqual(result[1].expected_http_status, 201)
+
+    @patch(
+        "builtins.open",
+        new_callable=mock_open,
+        read_data="client;project_name\nTestClient;TestProject",
+    )
+    def test_read_requests_csv_missing_endpoint(self, mock_file):
+        with self.assertRaises(InvalidCsvHeaderError):
+            list(read_requests_csv("dummy_path"))
+
+    @patch(
+        "safeye.load_request_configs",
+        side_effect=InvalidCsvHeaderError(
+            "Missing required columns in requests.csv: endpoint"
+        ),
+    )
+    @patch("safeye.clean_old_logs")
+    @patch("safeye.ensure_log_dir")
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("safeye.datetime")
+    def test_execute_requests_invalid_csv(
+        self,
+        mock_datetime,
+        mock_file,
+        mock_ensure_log_dir,
+        mock_clean_old_logs,
+        mock_load_configs,
+    ):
+        mock_datetime.now.return_value = datetime(2024, 9, 28, 22, 35, 22, 5085)
+
+        execute_requests()
+
+        mock_file().write.assert_called_once_with(
+            "2024-09-28T22:35:22.005085 | ERROR | Failed to load requests.csv: "
+            "Missing required columns in requests.csv: endpoint\n"
+        )
+
+    @patch("safeye.http_session.send")
+    @patch("builtins.open", new_callable=mock_open)
+    def test_run_request_prepared(self, mock_file, mock_send):
+        prepared_request = MagicMock(url="http://example.com/")
+        config = make_config(notify_emails=(), prepared_request=prepared_request)
+        mock_send.return_value = MagicMock(status_code=200)
+
+        self.assertEqual(run_request(config), (False, None))
+        mock_send.assert_called_once()
+        self.assertIs(mock_send.call_args.args[0], prepared_request)
+        self.assertEqual(mock_send.call_args.kwargs["timeout"], (3.05, 7))
+
+    @patch(
+        "builtins.open",
+        new_callable=mock_open,
+        read_data="endpoint;http_method;probe_method\nnot a url;GET;HEAD",
+    )
+    def test_read_requests_csv_invalid_endpoint(self, mock_file):
+        result = list(read_requests_csv("dummy_path"))
+        self.assertIsNone(result[0].prepared_request)
+        self.assertIsNone(result[0].prepared_probe)
+
+    @patch(
+        "builtins.open",
+        new_callable=mock_open,
+        read_data="project_name;endpoint;headers_json\nTestProject;http://example.com;true",
+    )
+    def test_read_requests_csv_headers_not_object(self, mock_file):
+        result = list(read_requests_csv("dummy_path"))
+        self.assertIsNone(result[0].prepared_request)
+
+        # The error is reported as an alert for the project
+        in_alert, email = run_request(result[0])
+        self.assertTrue(in_alert)
+
+    @patch("safeye.http_session.request")
+    @patch("builtins.open", new_callable=mock_open)
+    def test_run_request_probe(self, mock_file, mock_request):
+        config = make_config(notify_emails=(), probe_method="HEAD")
+        ok_response = MagicMock(status_code=200)
+        not_allowed_response = MagicMock(status_code=405)
+
+        # The probe succeeds, so the full request is skipped
+        mock_request.side_effect = [ok_response]
+        self.assertEqual(run_request(config), (False, None))
+        mock_request.assert_called_once_with(
+            method="HEAD",
+            url="http://example.com",
+            headers={},
+            timeout=(3.05, 7),
+        )
+
+        # HEAD isn't allowed, so the full request is sent
+        mock_request.reset_mock()
+        mock_request.side_effect = [not_allowed_response, ok_response]
+        self.assertEqual(run_request(config), (False, None))
+        self.assertEqual(mock_request.call_count, 2)
+        mock_request.assert_called_with(
+            method="GET",
+            url="http://example.com",
+            headers={},
+            json=None,
+            timeout=(3.05, 7),
+        )
+
+    @patch("safeye.http_session.request")
+    @patch("builtins.open", new_callable=mock_open)
+    def test_run_request_backoff(self, mock_file, mock_request):
+        config = make_config(notify_emails=())
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        # Third cycle is skipped after two consecutive errors
+        mock_request.side_effect = [
+            requests.ConnectionError(),
+            requests.ConnectionError(),
+            mock_response,
+        ]
+
+        results = [run_request(config) for _ in range(4)]
+
+        self.assertEqual(
+            results, [(True, None), (True, None), (True, None), (False, None)]
+        )
+        self.assertEqual(mock_request.call_count, 3)
+        self.assertEqual(failure_state, {})
+
+        # A POST to the same endpoint has its own backoff
+        post_config = config._replace(http_method="POST", probe_method="POST")
+        mock_request.reset_mock()
+        mock_request.side_effect = [
+            requests.ConnectionError(),
+            requests.ConnectionError(),
+            mock_response,
+        ]
+        run_request(config)
+        run_request(config)
+        self.assertEqual(run_request(post_config), (False, None))
+        self.assertEqual(run_request(config), (True, None))
+        self.assertEqual(mock_request.call_count, 3)
+
+    @patch("safeye.time.sleep")
+    @patch("safeye.time.monotonic")
+    @patch("safeye.execute_requests")
+    def test_scheduler(self, mock_execute, mock_monotonic, mock_sleep):
+        # Second run takes 5 seconds, third run stops the loop
+        mock_monotonic.side_effect = [1000, 1000, 1000 + 1805]
+        mock_execute.side_effect = [None, None, KeyboardInterrupt]
+
+        with self.assertRaises(KeyboardInterrupt):
+            scheduler()
+
+        self.assertEqual(mock_execute.call_count, 3)
+        mock_sleep.assert_has_calls([call(1800), call(1795)])
+
+    @patch("safeye.time.sleep")
+    @patch("safeye.time.monotonic")
+    @patch("safeye.execute_requests")
+    def test_scheduler_overrun(self, mock_execute, mock_monotonic, mock_sleep):
+        # First run takes 2000 seconds, the schedule restarts when it ends
+        mock_monotonic.side_effect = [1000, 1000 + 2000, 1000 + 2001]
+        mock_execute.side_effect = [None, None, KeyboardInterrupt]
+
+        with self.assertRaises(KeyboardInterrupt):
+            scheduler()
+
+        self.assertEqual(mock_execute.call_count, 3)
+        mock_sleep.assert_has_calls([call(0), call(1799)])
+
 
 if __name__ == "__main__":
     unittest.main()